@@ -4,13 +4,36 @@ Michail E. Koutrakis
 Github: https://github.com/mkoutra
 """
 
+import argparse
+
 from lib.Decks import Deck
+from lib.EventLog import EventLog
 from lib.GameWindow import GameWindow
 
 def main():
     """Main function."""
-    deck = Deck()
-    window = GameWindow(deck)
+    parser = argparse.ArgumentParser(description = "Pasientza card game.")
+    parser.add_argument("--decks", type = int, default = 1,
+                        help = "number of 52 card decks used (default: 1)")
+    parser.add_argument("--suitdecks", type = int, default = None,
+                        help = "number of SuitDecks (default: 8 per deck)")
+    parser.add_argument("--log", metavar = "FILE", default = None,
+                        help = "write the game events to FILE")
+    args = parser.parse_args()
+
+    if args.decks < 1:
+        parser.error("--decks must be at least 1")
+    if args.suitdecks is None:
+        n_suitdecks = 8 * args.decks
+    elif args.suitdecks < 1:
+        parser.error("--suitdecks must be at least 1")
+    else:
+        n_suitdecks = args.suitdecks
+
+    deck = Deck(deck_size = 52 * args.decks)
+    event_log = EventLog(args.log) if args.log else None
+    window = GameWindow(deck, n_suitdecks = n_suitdecks,
+                        event_log = event_log)
     window.draw()
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+# Makes the lib package importable when pytest is run as `pytest tests`.
+#----------------------------------
+#Michail E. Koutrakis
+#Github: https://github.com/mkoutra
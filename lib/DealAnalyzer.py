@@ -0,0 +1,183 @@
+"""This file contains a static analyzer that classifies a deal as
+definitely dead, definitely winnable or unknown without searching.
+It is meant as a cheap filter before simulating or solving deals.
+
+A deal is dead when some card can never be placed. A card can only be
+placed if it is an A or a K or a card next to it (same suit, value one
+larger or smaller) was placed before, and only if it can reach the top
+of soros. With no cards removed every round is the same, and only the
+third card of each draw (and the last card of the deck) reaches the top.
+A card can reach the top later only if a card drawn before it was
+removed (the groups of three change) or the card drawn after it was.
+Repeating these rules until nothing changes gives every card that may
+ever be placed.
+
+A deal is winnable when a greedy player, who places the top card of
+soros whenever it fits, wins it. It is played on plain lists instead
+of GameState, so that it stays allocation free and takes microseconds.
+
+----------------------------------
+Michail E. Koutrakis
+Github: https://github.com/mkoutra
+"""
+
+from typing import Dict, Iterable, List
+
+from .Decks import Deck
+from .GameState import SUITDECK_SIZE, card_code, suitdeck_step
+
+DEAD = "dead"
+WINNABLE = "winnable"
+UNKNOWN = "unknown"
+
+# Codes of the cards with the same suit and a value one larger or smaller.
+# The dead check allows both, so it never calls a winnable deal dead.
+_neighbours = [tuple(c for c in (code - 1, code + 1)
+                     if 0 <= c < 52 and c // 13 == code // 13)
+               for code in range(52)]
+
+# Codes of the cards of Deck.fill_normal_deck(), in the same order
+_normal_deck = Deck(full = False)
+_normal_deck.fill_normal_deck()
+_normal_deck_codes = [card_code(card) for card in _normal_deck[:]]
+del _normal_deck
+
+def permutation_order(permutation) -> List[int]:
+    """Returns the draw order (card codes, top card first) of a deck
+    filled with fill_normal_deck() and shuffled with permutation,
+    e.g. a row of DealGenerator.deals().
+    """
+    n = len(_normal_deck_codes)
+    return [_normal_deck_codes[permutation[i] % n]
+            for i in range(len(permutation) - 1, -1, -1)]
+
+def _is_dead(order:List[int], n_suitdecks:int) -> bool:
+    n_cards = len(order)
+
+    if n_suitdecks * SUITDECK_SIZE < n_cards:
+        return True
+
+    positions:List[List[int]] = [[] for _ in range(52)]   # Code -> positions
+    for p, code in enumerate(order):
+        positions[code].append(p)
+
+    placed = [False] * n_cards
+    n_placed_codes = [0] * 52   # Placed copies of every card
+    n_placed = 0
+    first_placed = n_cards      # Position of the first card placed
+
+    # Positions to check again, every card is checked when its
+    # neighbours or the cards around it are placed.
+    to_check = list(range(n_cards - 1, -1, -1))
+    while to_check:
+        p = to_check.pop()
+        if placed[p]:
+            continue
+
+        # Can it reach the top of soros?
+        if not ((p + 1) % 3 == 0 or p == n_cards - 1
+                or first_placed < p
+                or (p + 1 < n_cards and placed[p + 1])):
+            continue
+
+        # Is it an A, a K or next to a card already placed?
+        code = order[p]
+        value = code % 13
+        if not (value == 0 or value == 12
+                or n_placed_codes[code - 1]
+                or n_placed_codes[code + 1]):
+            continue
+
+        placed[p] = True
+        n_placed_codes[code] += 1
+        n_placed += 1
+
+        if p < first_placed:
+            to_check.extend(range(p + 1, first_placed))
+            first_placed = p
+        if p > 0:
+            to_check.append(p - 1)
+        for c in _neighbours[code]:
+            to_check.extend(positions[c])
+
+    return n_placed < n_cards
+
+def _greedy_wins(order:List[int], n_suitdecks:int) -> bool:
+    stock = order[::-1]             # Top card at position -1
+    soros:List[int] = []
+    steps = [0] * n_suitdecks       # 1 when started with A, -1 with K
+    sizes = [0] * n_suitdecks
+    n_empty = n_suitdecks
+    wanted:List[List[int]] = [[] for _ in range(52)]  # Code -> SuitDecks
+
+    placed = True   # A card was placed since the last recycle
+    while True:
+        while soros:
+            code = soros[-1]
+            if wanted[code]:
+                # The first SuitDeck accepting it, as GameState would
+                target = min(wanted[code])
+                wanted[code].remove(target)
+            elif n_empty and code % 13 in (0, 12):
+                target = sizes.index(0)
+                steps[target] = suitdeck_step(code)
+                n_empty -= 1
+            else:
+                break
+
+            sizes[target] += 1
+            if sizes[target] < SUITDECK_SIZE:
+                wanted[code + steps[target]].append(target)
+            soros.pop()
+            placed = True
+
+        if not stock:
+            if not soros:
+                return True
+            # A whole round without placing a card repeats forever.
+            if not placed:
+                return False
+            soros.reverse()
+            stock, soros = soros, []
+            placed = False
+
+        for _ in range(3):
+            if not stock:
+                break
+            soros.append(stock.pop())
+
+def analyze_order(order:List[int], n_suitdecks:int = 8) -> str:
+    """Classifies a deal given as card codes in draw order (top card
+    first). Returns DEAD, WINNABLE or UNKNOWN.
+    """
+    if _is_dead(order, n_suitdecks):
+        return DEAD
+    if _greedy_wins(order, n_suitdecks):
+        return WINNABLE
+    return UNKNOWN
+
+def analyze(deck:Deck, n_suitdecks:int = 8) -> str:
+    """Classifies a new game played with deck.
+    Returns DEAD, WINNABLE or UNKNOWN.
+    """
+    return analyze_order([card_code(card) for card in deck[::-1]],
+                         n_suitdecks)
+
+def analyze_batch(permutations:Iterable, n_suitdecks:int = 8) -> Dict:
+    """Classifies many deals given as permutations of a normal deck,
+    e.g. DealGenerator.deals(). Returns the number of deals of every
+    kind and the fraction of deals resolved (not UNKNOWN).
+    """
+    counts = {DEAD: 0, WINNABLE: 0, UNKNOWN: 0}
+
+    # Rows of numpy arrays are much slower to index than lists
+    if hasattr(permutations, "tolist"):
+        permutations = permutations.tolist()
+
+    for permutation in permutations:
+        counts[analyze_order(permutation_order(permutation),
+                             n_suitdecks)] += 1
+
+    total = sum(counts.values())
+    counts["resolved"] = (total - counts[UNKNOWN]) / total if total else 0.0
+    return counts
@@ -0,0 +1,80 @@
+"""This file contains the DealGenerator class used to create
+reproducible deals. Every deal is a pure function of a seed and the
+deal's index, so deal k can be generated directly and several workers
+can share a run without sharing any RNG state.
+
+----------------------------------
+Michail E. Koutrakis
+Github: https://github.com/mkoutra
+"""
+
+import numpy as np
+
+from .Decks import Deck
+
+class DealGenerator:
+    """Counter-based generator of deck permutations.
+    Deal k uses its own window of the Philox counter, therefore
+    deals(start, count) returns the same rows as deal(start), ...,
+    deal(start + count - 1) no matter how a run is split.
+    """
+
+    _words_per_block = 4    # Philox produces 4 64-bit words per counter
+    _chunk = 1 << 16        # Deals generated at once in deals()
+
+    def __init__(self, seed:int, deck_size:int = 52):
+        """seed: non negative integer, the key of the Philox generator.
+        deck_size: optional, number of cards on each permutation.
+        """
+        if seed < 0:
+            raise AttributeError("Seed must be non negative.")
+
+        self._seed = seed
+        self._deck_size = deck_size
+        # Number of counter values reserved for each deal
+        self._blocks_per_deal = -(-deck_size // DealGenerator._words_per_block)
+        self._dtype = np.uint8 if deck_size <= 256 else np.uint16
+
+    def seed(self) -> int:
+        """Returns the seed of the generator."""
+        return self._seed
+
+    def deck_size(self) -> int:
+        """Returns the number of cards on each permutation."""
+        return self._deck_size
+
+    def generator(self, k:int) -> np.random.Generator:
+        """Returns a numpy Generator positioned at the start of deal k."""
+        bit_gen = np.random.Philox(key = self._seed,
+                                   counter = k * self._blocks_per_deal)
+        return np.random.Generator(bit_gen)
+
+    def deal(self, k:int) -> np.ndarray:
+        """Returns the permutation of deal k."""
+        return self.deals(k, 1)[0]
+
+    def deals(self, start:int, count:int) -> np.ndarray:
+        """Returns an array of shape (count, deck_size). Row i is
+        the permutation of deal start + i.
+        """
+        if start < 0 or count < 0:
+            raise AttributeError("Arguments must be non negative.")
+
+        out = np.empty((count, self._deck_size), dtype = self._dtype)
+        words = self._blocks_per_deal * DealGenerator._words_per_block
+
+        for first in range(0, count, DealGenerator._chunk):
+            n = min(DealGenerator._chunk, count - first)
+            raw = self.generator(start + first).bit_generator.random_raw(
+                n * words)
+            keys = raw.reshape(n, words)[:, :self._deck_size]
+            out[first:first + n] = np.argsort(keys, axis = 1, kind = "stable")
+
+        return out
+
+    def deck(self, k:int) -> Deck:
+        """Returns a full Deck shuffled with the permutation of deal k."""
+        deck = Deck(full = False, deck_size = self._deck_size)
+        deck.fill_normal_deck()
+        deck.shuffle(self.deal(k))
+        return deck
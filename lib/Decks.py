@@ -1,7 +1,8 @@
 """This file contains the Deck class used to represent a normal
-52 playing card deck. Also, it contains a class SuitDeck inherited
-by Deck that is used to represent the eight, initially empty stacks
-used to store the cards removed from Deck and 'soros'.
+52 playing card deck, or several of them shuffled together. Also, it
+contains a class SuitDeck inherited by Deck that is used to represent
+the initially empty stacks used to store the cards removed from Deck
+and 'soros'.
 
 ----------------------------------
 Michail E. Koutrakis
@@ -10,7 +11,7 @@ Github: https://github.com/mkoutra
 
 import copy
 import random
-from typing import List
+from typing import Dict, List
 
 from .Card import Card
 
@@ -19,31 +20,43 @@ class Deck:
 
     _suitToSymbol = {'c': '♣', 'd': '♦', 'h': '♥', 's': '♠'}
     _allRanks = [str(i) for i in range(2, 11)] + ['J', 'Q', 'K', 'A']
+    _standard_size = 52
 
     def __init__(self, full = True, deck_size = 52):
-        """full: optional, If True the deck contains deck_size cards"""
+        """full: optional, If True the deck contains deck_size cards.
+        deck_size: optional, a multiple of 52 gives a game played
+        with deck_size // 52 standard decks shuffled together.
+        """
         self._deck_cards:List[Card] = []    # Cards on the deck.
         self._removed_cards:List[Card] = [] # Cards no longer on the deck
         self._number_of_cards = 0           # Number of cards on the deck
         self._deck_size = deck_size         # Number of cards on a full deck
+        self._card_counts:Dict[str, int] = {}   # Card id -> copies on deck
+
+        # Copies of the same card allowed (one per standard deck used)
+        self._n_copies = max(1, -(-deck_size // Deck._standard_size))
 
         if full:
-            self.fill_normal_deck()     # Fill deck with the 52 cards
+            self.fill_normal_deck()     # Fill deck with deck_size cards
             self.shuffle()              # Shuffle deck
 
     def deck_size(self):
         """Returns the number of cards contained on a full deck."""
         return self._deck_size
 
+    def n_copies(self) -> int:
+        """Returns how many copies of the same card the deck can hold."""
+        return self._n_copies
+
     def contains(self, card: Card) -> bool:
         """Returns True if the card with the rank and the suit
         given is inside the deck.
         """
-        for deck_card in self._deck_cards:
-            if (deck_card.rank() == card.rank() and
-                    deck_card.suit() == card.suit()):
-                return True
-        return False
+        return self._card_counts.get(card.id(), 0) > 0
+
+    def count(self, card: Card) -> int:
+        """Returns the number of copies of the card inside the deck."""
+        return self._card_counts.get(card.id(), 0)
 
     def push(self, card: Card) -> None:
         """ Place a playing card with the rank and the suit given
@@ -51,15 +64,21 @@ class Deck:
         """
         # NOTE: Top card is placed in position -1 inside lists.
 
-        if self.contains(card):
+        if self.count(card) >= self._n_copies:
             raise Exception(f"Card {card} is already inside the deck.")
 
         if self._number_of_cards < self._deck_size:
-            self._deck_cards.append(card)
-            self._number_of_cards += 1
+            self._append(card)
         else:
             raise Exception(f"Cannot push {card}. Deck is full.")
 
+    def _append(self, card: Card) -> None:
+        """Place card on top of the deck without checking the rules."""
+        card_id = card.id()
+        self._deck_cards.append(card)
+        self._card_counts[card_id] = self._card_counts.get(card_id, 0) + 1
+        self._number_of_cards += 1
+
     def pop(self) -> Card:
         """Removes and returns a card from the top of the deck,
         else None.
@@ -69,37 +88,68 @@ class Deck:
         if self._deck_cards:
             popped_card = self._deck_cards.pop()
             self._removed_cards.append(popped_card)
+            self._card_counts[popped_card.id()] -= 1
             self._number_of_cards -= 1
             return popped_card
 
         return None
 
-    def shuffle(self) -> None:
-        """ Shuffle the cards on the deck."""
-        if self._number_of_cards > 0:
+    def shuffle(self, permutation = None) -> None:
+        """ Shuffle the cards on the deck.
+        permutation: optional, sequence with the new position of every
+        card, e.g. a row of DealGenerator.deals(). Card at position
+        permutation[i] is moved to position i. If None the global
+        random generator is used.
+        """
+        if self._number_of_cards == 0:
+            return
+
+        if permutation is None:
             random.shuffle(self._deck_cards)
+            return
+
+        if len(permutation) != self._number_of_cards:
+            raise Exception("Permutation size does not match the deck.")
+
+        # Every position must appear exactly once
+        seen = [False] * self._number_of_cards
+        for i in permutation:
+            if not 0 <= i < self._number_of_cards or seen[i]:
+                raise Exception("Invalid permutation.")
+            seen[i] = True
+
+        cards = self._deck_cards
+        self._deck_cards = [cards[i] for i in permutation]
 
     def fill_normal_deck(self) -> None:
         """Fill the deck with the number of cards specified
         on initialization.
         """
-        for suit in Deck._suitToSymbol:
-            for rank in Deck._allRanks:
-                self.push(Card(rank, suit))
+        if self._deck_size % Deck._standard_size != 0:
+            raise Exception(f"Can't fill a deck of {self._deck_size} cards.")
+
+        for _ in range(self._deck_size // Deck._standard_size):
+            for suit in Deck._suitToSymbol:
+                for rank in Deck._allRanks:
+                    self.push(Card(rank, suit))
 
     def make_empty(self) -> None:
         """Remove all cards from deck"""
         self._deck_cards.clear()
         self._removed_cards.clear()
+        self._card_counts.clear()
         self._number_of_cards = 0
 
     def restore(self) -> None:
-        """Bring deck back to its original condition with 52 cards."""
+        """Bring deck back to its original condition with deck_size cards."""
         if (self._number_of_cards
                 + len(self._removed_cards) != self._deck_size):
             raise Exception("Can't go back to original deck.")
 
         self._number_of_cards = self._deck_size
+        for card in self._removed_cards:
+            card_id = card.id()
+            self._card_counts[card_id] = self._card_counts.get(card_id, 0) + 1
         self._deck_cards += self._removed_cards[::-1]
         self._removed_cards.clear()
 
@@ -150,29 +200,37 @@ class Deck:
         return s
 
     def __getitem__(self, x:int) -> List[Card]:
-        if 0 <= x < self._number_of_cards or isinstance(x, slice):
+        if isinstance(x, slice) or 0 <= x < self._number_of_cards:
             return self._deck_cards[x]
         return None
 
+    def _empty_like(self):
+        """Returns an empty deck with the same size as this one."""
+        return Deck(full = False, deck_size = self._deck_size)
+
     def __copy__(self):
-        copy_instance = Deck(full = False)
+        copy_instance = self._empty_like()
         copy_instance._deck_cards = self._deck_cards.copy()
         copy_instance._removed_cards = self._removed_cards.copy()
+        copy_instance._card_counts = self._card_counts.copy()
         copy_instance._number_of_cards = self._number_of_cards
         return copy_instance
 
     def __deepcopy__(self, memo):
-        copy_instance = Deck(full = False)
+        copy_instance = self._empty_like()
         copy_instance._deck_cards = copy.deepcopy(self._deck_cards)
         copy_instance._removed_cards = copy.deepcopy(self._removed_cards)
+        copy_instance._card_counts = self._card_counts.copy()
         copy_instance._number_of_cards = self._number_of_cards
         return copy_instance
 
     def __del__(self):
         self._deck_cards.clear()
         self._removed_cards.clear()
+        self._card_counts.clear()
         del self._deck_cards
         del self._removed_cards
+        del self._card_counts
         del self._number_of_cards
 
 
@@ -205,15 +263,24 @@ class SuitDeck(Deck):
                 raise Exception(f"SuitDeck can't start with {card.rank()}.")
 
             self._deck_suit = card.suit()
-            self._deck_cards.append(card)
-            self._number_of_cards += 1
+            self._append(card)
         else:
             if self._deck_suit != card.suit():
                 raise Exception("Card's suit does not match deck's suit.")
 
-            # Insert card only if it is in the correct order
-            if abs(self.top().value() - card.value()) != 1:
+            # Insert card only if it is in the correct order:
+            # A->2->...->K when started with A, K->Q->...->A with K.
+            if card.value() != self.top().value() + self.direction():
                 raise Exception(f"Card {card} is not in correct order.")
 
-            self._deck_cards.append(card)
-            self._number_of_cards += 1
+            self._append(card)
+
+    def direction(self) -> int:
+        """Returns 1 if the SuitDeck started with A (values go up),
+        -1 if it started with K (values go down) and 0 if it is empty."""
+        if self.is_empty():
+            return 0
+        return 1 if self._deck_cards[0].value() == 1 else -1
+
+    def _empty_like(self):
+        return SuitDeck(self._deck_suit)
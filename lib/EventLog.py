@@ -0,0 +1,138 @@
+"""This file contains the EventLog class used to log the events of a
+Pasientza game. Events are stored in a preallocated ring buffer and
+a background thread writes them to a rotating file in batches, so
+logging an event only costs a few list assignments.
+
+----------------------------------
+Michail E. Koutrakis
+Github: https://github.com/mkoutra
+"""
+
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from enum import Enum
+
+class EventType(Enum):
+    """Kinds of events logged during a game."""
+    DRAW = "draw"
+    PLACE = "place"
+    REJECT = "reject"
+    RECYCLE = "recycle"
+    UNDO = "undo"
+    WIN = "win"
+    ERROR = "error"
+
+
+class EventLog:
+    """Ring buffer of game events flushed to a rotating file."""
+
+    enabled = True
+
+    def __init__(self, path:str, capacity:int = 4096,
+                 flush_interval:float = 1.0,
+                 max_bytes:int = 1 << 20, backup_count:int = 3):
+        """path: file the events are written to.
+        capacity: optional, number of events kept in memory. If the
+        file writer falls behind, the oldest events are overwritten.
+        flush_interval: optional, seconds between two writes.
+        max_bytes, backup_count: optional, size and number of files
+        kept, see logging.handlers.RotatingFileHandler.
+        """
+        self._capacity = capacity
+        self._times = [0.0] * capacity
+        self._types = [None] * capacity
+        self._fields = [None] * capacity
+        self._n_logged = 0      # Events logged so far
+        self._n_flushed = 0     # Events written (or dropped) so far
+        self._n_dropped = 0
+
+        self._flush_interval = flush_interval
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes = max_bytes, backupCount = backup_count,
+            encoding = "utf-8")
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target = self._run, daemon = True)
+        self._thread.start()
+
+    def record(self, event_type:EventType, **fields) -> None:
+        """Store an event. fields must be JSON serializable."""
+        i = self._n_logged % self._capacity
+        self._times[i] = time.time()
+        self._types[i] = event_type
+        self._fields[i] = fields
+        self._n_logged += 1
+
+    def n_dropped(self) -> int:
+        """Returns the number of events overwritten before written."""
+        return self._n_dropped
+
+    def flush(self) -> None:
+        """Write the events not written yet. Events overwritten before
+        being written are reported with a single "dropped" event."""
+        n_logged = self._n_logged
+        first = max(self._n_flushed, n_logged - self._capacity)
+
+        lines = []
+        for n in range(first, n_logged):
+            i = n % self._capacity
+            lines.append(json.dumps({"time": self._times[i],
+                                     "event": self._types[i].value,
+                                     **self._fields[i]}))
+
+        # record() may have reused the oldest slots while they were read.
+        # It fills slot n % capacity before counting event n, so one more
+        # slot than the count says may be half written.
+        overwritten = self._n_logged + 1 - self._capacity - first
+        if overwritten > 0:
+            del lines[:overwritten]
+            first += overwritten
+
+        dropped = first - self._n_flushed
+        if dropped > 0:
+            self._n_dropped += dropped
+            lines.insert(0, json.dumps({"time": time.time(),
+                                        "event": "dropped",
+                                        "count": dropped}))
+        self._n_flushed = n_logged
+
+        if lines:
+            self._handler.emit(logging.makeLogRecord(
+                {"msg": "\n".join(lines)}))
+
+    def _run(self):
+        while not self._stop_event.wait(self._flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the writer thread and write the remaining events."""
+        self._stop_event.set()
+        self._thread.join()
+        self.flush()
+        self._handler.close()
+
+
+class NullEventLog:
+    """An EventLog that does nothing, used when logging is disabled.
+    Callers check the enabled attribute before building an event,
+    so a disabled log costs a single attribute lookup.
+    """
+
+    enabled = False
+
+    def record(self, event_type:EventType, **fields) -> None:
+        """Ignore the event."""
+
+    def n_dropped(self) -> int:
+        """Returns 0, nothing is stored."""
+        return 0
+
+    def flush(self) -> None:
+        """Nothing to write."""
+
+    def close(self) -> None:
+        """Nothing to close."""
@@ -0,0 +1,224 @@
+"""This file contains the GameState class, an immutable representation
+of a Pasientza game used for searching (hints, solvers, look-ahead).
+Moves return new states that share almost everything with the old one,
+so branching does not copy any Deck.
+
+----------------------------------
+Michail E. Koutrakis
+Github: https://github.com/mkoutra
+"""
+
+import random
+from typing import Callable, List, Optional, Tuple
+
+from .Card import Card
+from .Decks import Deck, SuitDeck
+
+_suits = list(Deck._suitToSymbol)
+_value_to_rank = {1: 'A', 11: 'J', 12: 'Q', 13: 'K'}
+SUITDECK_SIZE = 13     # Cards on a full SuitDeck
+
+# A stack is a linked list of cons cells (card code, size, rest), where
+# the first cell is the top card. None is the empty stack. SuitDeck cells
+# also keep the step between two cards, 1 when started with A (going up)
+# and -1 when started with K (going down).
+Stack = Optional[Tuple[int, int, "Stack"]]
+Pile = Optional[Tuple[int, int, "Pile", int]]
+
+def card_code(card:Card) -> int:
+    """Returns the code of a card, 13 * suit index + value - 1."""
+    return 13 * _suits.index(card.suit()) + card.value() - 1
+
+def code_card(code:int) -> Card:
+    """Returns the Card with the code given."""
+    value = code % 13 + 1
+    return Card(_value_to_rank.get(value, str(value)), _suits[code // 13])
+
+def _push(stack:Stack, code:int) -> Stack:
+    return (code, 1 if stack is None else stack[1] + 1, stack)
+
+def _to_stack(codes) -> Stack:
+    """Returns a stack with the last code given on top."""
+    stack = None
+    for code in codes:
+        stack = _push(stack, code)
+    return stack
+
+def suitdeck_step(code:int) -> int:
+    """Returns the step of a SuitDeck started with the card code given,
+    1 for an A (going up) and -1 for a K (going down)."""
+    return 1 if code % 13 == 0 else -1
+
+def _push_pile(pile:Pile, code:int) -> Pile:
+    if pile is None:
+        return (code, 1, None, suitdeck_step(code))
+    return (code, pile[1] + 1, pile, pile[3])
+
+def _to_pile(codes) -> Pile:
+    """Returns a SuitDeck pile with the last code given on top."""
+    pile = None
+    for code in codes:
+        pile = _push_pile(pile, code)
+    return pile
+
+def _fits(code:int, pile:Pile) -> bool:
+    """Same rules as SuitDeck.push()."""
+    if pile is None:
+        return code % 13 in (0, 12)     # A or K
+    top, size, _, step = pile
+    if size >= SUITDECK_SIZE:
+        return False
+    return top // 13 == code // 13 and code == top + step
+
+
+class GameState:
+    """Immutable state of a Pasientza game.
+    The deck is a position in a draw order shared by all states
+    until soros is recycled, soros and SuitDecks are stacks.
+    """
+
+    __slots__ = ("_order", "_pos", "_soros", "_piles")
+
+    def __init__(self, order:tuple, pos:int, soros:Stack, piles:tuple):
+        """order: card codes in the order they are drawn.
+        pos: number of cards of order already drawn.
+        soros: stack of the cards removed from the deck.
+        piles: tuple with the pile of every SuitDeck.
+        """
+        self._order = order
+        self._pos = pos
+        self._soros = soros
+        self._piles = piles
+
+    @classmethod
+    def from_decks(cls, deck:Deck, soros:Deck,
+                   suit_decks:List[SuitDeck]) -> "GameState":
+        """Returns the state of a game played with the decks given."""
+        order = tuple(card_code(card) for card in deck[::-1])
+        soros_stack = _to_stack(card_code(card) for card in soros[:])
+        piles = tuple(_to_pile(card_code(card) for card in sd[:])
+                      for sd in suit_decks)
+        return cls(order, 0, soros_stack, piles)
+
+    @classmethod
+    def from_deck(cls, deck:Deck, n_suitdecks:int = 8) -> "GameState":
+        """Returns the state of a new game played with deck."""
+        return cls(tuple(card_code(card) for card in deck[::-1]),
+                   0, None, (None,) * n_suitdecks)
+
+    def deck_size(self) -> int:
+        """Returns the number of cards on the deck."""
+        return len(self._order) - self._pos
+
+    def soros_size(self) -> int:
+        """Returns the number of cards on soros."""
+        return 0 if self._soros is None else self._soros[1]
+
+    def soros_top(self) -> Optional[int]:
+        """Returns the code of the top card of soros, otherwise None."""
+        return None if self._soros is None else self._soros[0]
+
+    def piles(self) -> tuple:
+        """Returns the piles of the SuitDecks."""
+        return self._piles
+
+    def is_won(self) -> bool:
+        """Checks if both the deck and soros are empty."""
+        return self._soros is None and self._pos == len(self._order)
+
+    def recycle(self) -> "GameState":
+        """Returns the state after turning soros over, so that it
+        becomes the new deck. The bottom card of soros is drawn first."""
+        if self._soros is None:
+            raise Exception("Deck and soros are empty.")
+        codes, stack = [], self._soros
+        while stack is not None:
+            codes.append(stack[0])
+            stack = stack[2]
+        return GameState(tuple(reversed(codes)), 0, None, self._piles)
+
+    def draw(self) -> "GameState":
+        """Returns the state after drawing three cards. When the deck
+        is empty soros is recycled first."""
+        if self._pos == len(self._order):
+            return self.recycle().draw()
+
+        order, pos, soros = self._order, self._pos, self._soros
+        for code in order[pos:pos + 3]:
+            soros = _push(soros, code)
+
+        return GameState(order, min(pos + 3, len(order)), soros, self._piles)
+
+    def shuffled_deck(self, rng:random.Random) -> "GameState":
+        """Returns the same state with the cards of the deck shuffled."""
+        codes = list(self._order[self._pos:])
+        rng.shuffle(codes)
+        return GameState(tuple(codes), 0, self._soros, self._piles)
+
+    def legal_moves(self) -> List[int]:
+        """Returns the indices of the SuitDecks accepting the top card
+        of soros."""
+        if self._soros is None:
+            return []
+        code = self._soros[0]
+        return [i for i, pile in enumerate(self._piles) if _fits(code, pile)]
+
+    def place(self, deck_id:int) -> "GameState":
+        """Returns the state after moving the top card of soros to
+        the SuitDeck given."""
+        if self._soros is None:
+            raise Exception("Soros is empty.")
+
+        code, _, soros = self._soros
+        pile = self._piles[deck_id]
+
+        if not _fits(code, pile):
+            raise Exception(f"Card {code_card(code)} can't be placed on "
+                            f"SuitDeck {deck_id}.")
+
+        piles = (self._piles[:deck_id] + (_push_pile(pile, code),)
+                 + self._piles[deck_id + 1:])
+        return GameState(self._order, self._pos, soros, piles)
+
+    def deck_codes(self) -> List[int]:
+        """Returns the codes of the deck, the top card first."""
+        return list(self._order[self._pos:])
+
+    def soros_codes(self) -> List[int]:
+        """Returns the codes of soros, the top card first."""
+        codes, stack = [], self._soros
+        while stack is not None:
+            codes.append(stack[0])
+            stack = stack[2]
+        return codes
+
+    def __repr__(self):
+        return (f"GameState(deck={self.deck_size()}, "
+                f"soros={self.soros_size()}, "
+                f"piles={[0 if p is None else p[1] for p in self._piles]})")
+
+
+def play_out(state:GameState,
+             choose:Callable[[GameState, List[int]], int]) -> bool:
+    """Plays from state and returns True if the game is won.
+    The top card of soros is placed whenever it fits, on the SuitDeck
+    returned by choose(state, legal moves), otherwise cards are drawn.
+    The game is lost after a whole round without placing a card.
+    """
+    placed = True   # A card was placed since the last recycle
+    while not state.is_won():
+        moves = state.legal_moves()
+        if moves:
+            state = state.place(choose(state, moves))
+            placed = True
+            continue
+
+        if state.deck_size() == 0:
+            # The next draw turns soros over, every round is the same
+            # as the previous one unless a card was placed.
+            if not placed:
+                return False
+            placed = False
+
+        state = state.draw()
+    return True
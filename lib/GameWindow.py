@@ -5,25 +5,50 @@ Michail E. Koutrakis
 Github: https://github.com/mkoutra
 """
 
-import copy
 import os
 import tkinter as tk
+from collections import deque
 
 from PIL import Image, ImageTk
 
 from .Card import Card
 from .Decks import Deck, SuitDeck
+from .EventLog import EventType, NullEventLog
+from .GameState import GameState
+from .WinEstimator import WinEstimator
 
 class GameWindow:
     """The Window for the Pasientza game."""
 
-    def __init__(self, deck):
+    def __init__(self, deck, n_suitdecks:int = 8, event_log = None):
+        """deck: the Deck to play with, its size defines the variant.
+        n_suitdecks: optional, number of SuitDecks (8 for one deck).
+        event_log: optional, EventLog storing the game events.
+        """
+        self._log = event_log if event_log is not None else NullEventLog()
+
         # Create decks variables needed to play the game
+        self._deck_size = deck.deck_size()
+        self._n_suitdecks = n_suitdecks
         self.__deck = deck
-        self.__soros = Deck(full = False)   # Cards removed from deck
-        self.__suit_decks:list = [SuitDeck() for _ in range(8)]
+        self.__soros = Deck(full = False, deck_size = self._deck_size)
+        self.__suit_decks:list = [SuitDeck() for _ in range(n_suitdecks)]
         self._n_cards_removed_last_round = 0
-        self._n_suitdecks = 8
+        self._undo_allowed = False
+        self._won = False
+        self._stock_seen = False    # Deck order known after a recycle
+
+        # The same game as a GameState for the win estimate, kept in step
+        # with the commands so that a move never re-encodes every card.
+        self._game_state = GameState.from_deck(deck, n_suitdecks)
+        self._state_before_draw = self._game_state   # Restored by undo
+
+        # Input commands waiting to be applied and redraw bookkeeping
+        self._commands:deque = deque()
+        self._process_job = None
+        self._redraw_all = False
+        self._state_changed = False
+        self._n_cards_drawn:list = [0] * n_suitdecks   # Per SuitDeck canvas
 
         # Window configuration
         self._win_dimensions = (980, 800)
@@ -36,6 +61,19 @@ class GameWindow:
         self._card_dimensions = (100, 130)
         self._card_images:dict = {} # Mapping card id, e.g. "10s" to image
 
+        # SuitDecks are placed in rows of 8. Their cards shrink with the
+        # number of rows so that all of them fit in the same window.
+        self._suitdecks_per_row = 8
+        n_rows = -(-n_suitdecks // self._suitdecks_per_row)
+        self._suitdeck_card_dimensions = (self._card_dimensions[0] // n_rows,
+                                          self._card_dimensions[1] // n_rows)
+        self._suitdeck_overlap = 35 // n_rows
+        self._suitdeck_images:dict = self._card_images
+
+        # Chance to win, estimated in a background process
+        self._estimator = WinEstimator()
+        self._estimate_poll_ms = 100
+
         # Buttons configuration
         button_configuration = {"background": "steelblue3",
                                 "activebackground": "steelblue4",
@@ -61,6 +99,7 @@ class GameWindow:
         self._soros_frame = tk.Frame(**frames_configurations)
         self._undo_frame = tk.Frame(**frames_configurations)
         self._replay_frame = tk.Frame(**frames_configurations)
+        self._estimate_frame = tk.Frame(**frames_configurations)
 
         # Place frames on the root window
         self._suitDecks_frame.place(relx = 0.0, rely = 0.02, anchor = tk.NW)
@@ -68,9 +107,14 @@ class GameWindow:
         self._soros_frame.place(relx = 0.55, rely = .75, anchor = tk.NW)
         self._undo_frame.place(relx = .85, rely = .9, anchor = tk.NW)
         self._replay_frame.place(relx = .85, rely = .8, anchor = tk.NW)
+        self._estimate_frame.place(relx = .02, rely = .8, anchor = tk.NW)
 
         # Load Playing Cards
-        self._load_images(dim = self._card_dimensions)
+        self._load_images(self._card_images, dim = self._card_dimensions)
+        if n_rows > 1:
+            self._suitdeck_images = {}
+            self._load_images(self._suitdeck_images,
+                              dim = self._suitdeck_card_dimensions)
 
         # Create SuitDeck frames and canvas
         self._all_SuitDeck_canvas:list = []
@@ -83,11 +127,13 @@ class GameWindow:
             suitdeck_canv = tk.Canvas(master = suitDeck_frame, cursor="hand2")
             suitdeck_canv.bind(sequence = "<Button-1>",
                                func = lambda e, x = i: \
-                                self._pick_suitDeck_callback(e, x))
+                                self._enqueue(self._place_card, x))
 
             self._all_SuitDeck_canvas.append(suitdeck_canv)
 
-            suitDeck_frame.grid(row = 0, column = i, padx = 10, sticky=tk.NW)
+            suitDeck_frame.grid(row = i // self._suitdecks_per_row,
+                                column = i % self._suitdecks_per_row,
+                                padx = 10, sticky = tk.NW)
 
         self._soros_canvas = tk.Canvas(master = self._soros_frame,
                                        width = self._card_dimensions[0],
@@ -99,68 +145,123 @@ class GameWindow:
                                       activebackground = "steelblue3",
                                       cursor = "hand2",
                                       relief = tk.RAISED,
-                                      command = self._deck_button_callback)
+                                      takefocus = 0,
+                                      command = lambda: \
+                                        self._enqueue(self._draw_cards))
 
         self._undo_button = tk.Button(master = self._undo_frame,
                                       text = "Undo",
                                       width = 4, height = 1,
                                       state = tk.DISABLED,
+                                      takefocus = 0,
                                       **button_configuration,
-                                      command = self._undo_callback)
+                                      command = lambda: \
+                                        self._enqueue(self._undo))
 
         self._replay_button = tk.Button(master = self._replay_frame,
                                         text = "New game",
                                         width = 7, height = 1,
+                                        takefocus = 0,
                                         **button_configuration,
-                                        command = self._replay_callback)
+                                        command = lambda: \
+                                            self._enqueue(self._new_game))
+
+        self._estimate_label = tk.Label(master = self._estimate_frame,
+                                        text = "",
+                                        bg = self._background,
+                                        fg = "white",
+                                        justify = tk.LEFT)
 
         # ------------------------- Widget placement --------------------------
         self._soros_canvas.pack()
         self._deck_button.pack(padx = 10)
         self._undo_button.pack(pady = 5)
         self._replay_button.pack(pady = 5)
+        self._estimate_label.pack()
         for i in range(self._n_suitdecks):
             self._all_SuitDeck_canvas[i].pack(pady = 5)
 
+        self._bind_keys()
+
         # ------------------------------ Drawing ------------------------------
         self._draw_initial_state()
 
-    # ---------------------------- Button Callbacks ---------------------------
+    # ----------------------------- Input handling ----------------------------
 
-    def _deck_button_callback(self):
-        # Modify undo button
-        self._undo_button.configure(
-            state = tk.NORMAL,
-            command = self._undo_callback)
+    def _bind_keys(self):
+        """Space draws cards, 1-9 place the top card of soros on one of
+        the first nine SuitDecks and Ctrl+Z undoes the last draw.
+        Buttons take no focus, so Space never also invokes a button."""
+        self._root.bind("<space>", lambda e: self._enqueue(self._draw_cards))
+
+        for i in range(min(self._n_suitdecks, 9)):
+            self._root.bind(f"<Key-{i + 1}>",
+                            lambda e, x = i: \
+                                self._enqueue(self._place_card, x))
+
+        for sequence in ("<Control-z>", "<Control-Z>"):
+            self._root.bind(sequence, lambda e: self._enqueue(self._undo))
+
+    def _enqueue(self, command, *args):
+        """Add a command to the queue. Queued commands are applied
+        in order when Tk is idle, followed by a single redraw."""
+        self._commands.append((command, args))
+
+        if self._process_job is None:
+            self._process_job = self._root.after_idle(self._process_commands)
+
+    def _process_commands(self):
+        self._process_job = None
+
+        while self._commands:
+            command, args = self._commands.popleft()
+            command(*args)
 
-        self._n_cards_removed_last_round = 0    # Required for undo button
+        self._redraw()
 
-        # If deck is empty make soros the new deck and redraw Blue card.
+    # ------------------------------- Commands --------------------------------
+
+    def _draw_cards(self):
+        """Move the three top cards of the deck to soros."""
+        self._n_cards_removed_last_round = 0    # Required for undo
+
+        # If deck is empty make soros the new deck.
+        # Swapping the two decks avoids copying every card on each round.
         if self.__deck.is_empty():
+            if self.__soros.is_empty():
+                return
             self.__soros.inverse()
-            del self.__deck
-            self.__deck = copy.deepcopy(self.__soros)
+            self.__deck, self.__soros = self.__soros, self.__deck
             self.__soros.make_empty()
-
-            self._deck_button.configure(image = self._card_images["Blue"])
+            self._game_state = self._game_state.recycle()
+            self._stock_seen = True
+            if self._log.enabled:
+                self._log.record(EventType.RECYCLE,
+                                 cards = self.__deck.number_of_cards())
 
         # Place cards in soros
         for _ in range(3):
             card = self.__deck.pop()
 
             if not isinstance(card, Card):
-                self._deck_button.configure(image = self._card_images["Blank"])
                 break
 
             self.__soros.push(card)
             self._n_cards_removed_last_round += 1
 
-        self._draw_soros()
+        self._state_before_draw = self._game_state
+        self._game_state = self._game_state.draw()
 
-    def _pick_suitDeck_callback(self, event, deck_id:int):
-        """Choose a suitDeck to place the top card of soros.
-        event is needed because of the way Canvas.bind() works.
-        """
+        if self._log.enabled:
+            self._log.record(EventType.DRAW,
+                             cards = [card.id() for card in
+                                      self.__soros.top_cards(
+                                          self._n_cards_removed_last_round)])
+        self._undo_allowed = True
+        self._state_changed = True
+
+    def _place_card(self, deck_id:int):
+        """Place the top card of soros on a suitDeck."""
         moving_card = self.__soros.pop()
 
         if not isinstance(moving_card, Card):
@@ -168,39 +269,43 @@ class GameWindow:
 
         try:
             self.__suit_decks[deck_id].push(moving_card)
-            self._undo_button.configure(state = tk.DISABLED)
-            self._draw_card_in_suitDeck(deck_id, moving_card)
-            self._draw_soros()
-
-            # Check if the game is over with
-            if self.__soros.is_empty() and self.__deck.is_empty():
-                self._draw_winning_window()
-        except:
+        except Exception as error:
             # Move card back to soros
             self.__soros.push(moving_card)
+            if self._log.enabled:
+                self._log.record(EventType.REJECT, card = moving_card.id(),
+                                 suitdeck = deck_id, reason = str(error))
+            return
+
+        self._game_state = self._game_state.place(deck_id)
+        if self._log.enabled:
+            self._log.record(EventType.PLACE, card = moving_card.id(),
+                             suitdeck = deck_id)
+        self._undo_allowed = False
+        self._state_changed = True
 
-    def _undo_callback(self):
+    def _undo(self):
         """Puts the cards last picked, back to deck.
         Can be used only once per round."""
-        if self.__soros.is_empty():
+        if not self._undo_allowed or self.__soros.is_empty():
             return
 
-        # Redraw deck's card
-        if self.__deck.is_empty():
-            self._deck_button.configure(image = self._card_images["Blue"])
-
         for _ in range(self._n_cards_removed_last_round):
             # Remove from soros and place to deck
             go_back_card = self.__soros.pop()
             self.__deck.push(go_back_card)
+        self._game_state = self._state_before_draw
 
-        # Makes undo button callable only once
-        self._n_cards_removed_last_round = 0
-        self._undo_button.configure(state = tk.DISABLED)
+        if self._log.enabled:
+            self._log.record(EventType.UNDO,
+                             cards = self._n_cards_removed_last_round)
 
-        self._draw_soros()
+        # Makes undo callable only once
+        self._n_cards_removed_last_round = 0
+        self._undo_allowed = False
+        self._state_changed = True
 
-    def _replay_callback(self):
+    def _new_game(self):
         # Remove cards from suitDecks
         for i in range(self._n_suitdecks):
             self.__suit_decks[i].make_empty()
@@ -208,18 +313,42 @@ class GameWindow:
         # Remove all elements from deck and soros
         del self.__deck
         del self.__soros
-        self.__deck = Deck(full = True)
-        self.__soros = Deck(full = False)
+        self.__deck = Deck(full = True, deck_size = self._deck_size)
+        self.__soros = Deck(full = False, deck_size = self._deck_size)
+        self._game_state = GameState.from_deck(self.__deck, self._n_suitdecks)
+        self._state_before_draw = self._game_state
 
         self._n_cards_removed_last_round = 0
+        self._undo_allowed = False
+        self._won = False
+        self._stock_seen = False
+        self._redraw_all = True
+        self._state_changed = True
 
-        # Draw decks in initial state
-        self._draw_initial_state()
+    # ------------------------------ WIN ESTIMATE -----------------------------
+
+    def _update_win_estimate(self):
+        """Send the current state to the estimator. Work on the
+        previous state is dropped."""
+        self._estimator.submit((self._game_state, self._stock_seen))
+        self._estimate_label.configure(text = "Chance to win: ...")
+
+    def _poll_win_estimate(self):
+        """Show the latest estimate. Runs every few ms using after()."""
+        estimate = self._estimator.poll()
+
+        if estimate is not None:
+            wins, n_games = estimate
+            self._estimate_label.configure(
+                text = f"Chance to win: {100 * wins / n_games:.0f}%"
+                       f"\n({n_games} games simulated)")
+
+        self._root.after(self._estimate_poll_ms, self._poll_win_estimate)
 
     # ------------------------------ LOAD IMAGES ------------------------------
 
-    def _load_images(self, dim):
-        """ Load cards, blank image and blue card and
+    def _load_images(self, images:dict, dim):
+        """ Load cards, blank image and blue card in images and
         resize them with the dimensions given."""
         # Load playing cards
         for fname in os.listdir(
@@ -229,25 +358,57 @@ class GameWindow:
             img = img.resize(dim)
 
             card_name = fname.strip(".png")
-            self._card_images[card_name] = ImageTk.PhotoImage(img)
+            images[card_name] = ImageTk.PhotoImage(img)
 
         # Load the Blank card
         img = Image.open(os.path.join(self._img_folder ,"Blank_img.jpg"))
         img = img.resize(dim)
-        self._card_images["Blank"] = ImageTk.PhotoImage(img)
+        images["Blank"] = ImageTk.PhotoImage(img)
 
         # Load the Blue playing card
         img = Image.open(
             os.path.join(self._img_folder, "Blue_playing_card.jpg"))
         img = img.resize(dim)
-        self._card_images["Blue"] = ImageTk.PhotoImage(img)
+        images["Blue"] = ImageTk.PhotoImage(img)
 
     # ------------------------------- DRAWING ---------------------------------
 
+    def _redraw(self):
+        """Redraw everything changed by the commands applied since
+        the last redraw."""
+        if self._redraw_all:
+            self._redraw_all = False
+            self._draw_initial_state()
+
+        self._draw_soros()
+
+        # Deck shows a blank card when it has no cards left
+        deck_image = "Blank" if self.__deck.is_empty() else "Blue"
+        self._deck_button.configure(image = self._card_images[deck_image])
+
+        self._undo_button.configure(
+            state = tk.NORMAL if self._undo_allowed else tk.DISABLED)
+
+        for i in range(self._n_suitdecks):
+            self._draw_new_cards_in_suitDeck(i)
+
+        if self._state_changed:
+            self._state_changed = False
+            self._update_win_estimate()
+
+        # Check if the game is over with
+        if (not self._won and self.__soros.is_empty()
+                and self.__deck.is_empty()):
+            self._won = True
+            if self._log.enabled:
+                self._log.record(EventType.WIN)
+            self._draw_winning_window()
+
     def _draw_initial_state(self):
         """Draw the decks when the game starts."""
 
-        blank_image = self._card_images["Blank"]
+        blank_image = self._suitdeck_images["Blank"]
+        self._n_cards_drawn = [0] * self._n_suitdecks
 
         # Draw the top of the deck button
         self._deck_button.configure(image = self._card_images["Blue"])
@@ -260,8 +421,8 @@ class GameWindow:
             self._all_SuitDeck_canvas[i].delete("all")
 
             self._all_SuitDeck_canvas[i].configure(
-                width = self._card_dimensions[0],
-                height = self._card_dimensions[1])
+                width = self._suitdeck_card_dimensions[0],
+                height = self._suitdeck_card_dimensions[1])
 
             self._all_SuitDeck_canvas[i].create_image(0, 0, anchor = tk.NW,
                                                       image = blank_image)
@@ -308,12 +469,22 @@ class GameWindow:
             overlap_images(self._soros_canvas, card_img,
                            x_overlap, y_overlap, i)
 
-    def _draw_card_in_suitDeck(self, deck_id:int, card:Card):
-        """Add a card on the SuitDeck Canvas vertically."""
-        card_img = self._card_images[card.id()]
+    def _draw_new_cards_in_suitDeck(self, deck_id:int):
+        """Add the cards not drawn yet on the SuitDeck Canvas."""
+        suit_deck = self.__suit_decks[deck_id]
+
+        for i in range(self._n_cards_drawn[deck_id],
+                       suit_deck.number_of_cards()):
+            self._draw_card_in_suitDeck(deck_id, suit_deck[i], i)
+
+        self._n_cards_drawn[deck_id] = suit_deck.number_of_cards()
 
-        overlap_images(self._all_SuitDeck_canvas[deck_id], card_img, 0, 35,
-                       self.__suit_decks[deck_id].number_of_cards() - 1)
+    def _draw_card_in_suitDeck(self, deck_id:int, card:Card, n:int):
+        """Add a card as the n-th card on the SuitDeck Canvas vertically."""
+        card_img = self._suitdeck_images[card.id()]
+
+        overlap_images(self._all_SuitDeck_canvas[deck_id], card_img, 0,
+                       self._suitdeck_overlap, n)
 
     def _draw_winning_window(self):
         winning_win = tk.Toplevel(master = self._root)
@@ -323,16 +494,29 @@ class GameWindow:
         try:
             win_img = Image.open(os.path.join(self._img_folder ,"win_photo.jpg"))
             self._card_images["Win"] = ImageTk.PhotoImage(win_img)
-        except:
-            print("Problem loading win image.")
+            win_label = tk.Label(master = winning_win,
+                                 image = self._card_images["Win"])
+        except Exception as error:
+            if self._log.enabled:
+                self._log.record(
+                    EventType.ERROR,
+                    reason = f"Problem loading win image: {error}")
+            win_label = tk.Label(master = winning_win, text = "YOU WIN !!!",
+                                 font = ("Helvetica", 32))
 
-        win_label = tk.Label(master = winning_win,
-                             image = self._card_images["Win"])
         win_label.pack()
 
     def draw(self):
         """Draw window"""
-        self._root.mainloop()
+        self._estimator.start()
+        self._update_win_estimate()
+        self._root.after(self._estimate_poll_ms, self._poll_win_estimate)
+
+        try:
+            self._root.mainloop()
+        finally:
+            self._estimator.stop()
+            self._log.close()
 
 
 def overlap_images(canvas, img, overlap_x, overlap_y, n:int):
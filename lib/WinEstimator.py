@@ -0,0 +1,147 @@
+"""This file contains the WinEstimator class used to estimate the
+chance to win a Pasientza game from its current state. The estimate
+comes from quick random games (rollouts) played in a separate process,
+so the window never waits for it.
+
+----------------------------------
+Michail E. Koutrakis
+Github: https://github.com/mkoutra
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import random
+from typing import List, Tuple
+
+from .GameState import GameState, play_out
+
+# A state is a GameState and whether the player knows the deck order,
+# True once soros has been turned over into the deck.
+State = Tuple[GameState, bool]
+
+def rollout(state:State, rng:random.Random) -> bool:
+    """Plays one game from state and returns True if it is won.
+    Until the deck is seen (before the first recycle) the order of its
+    cards is unknown to the player, so it is shuffled. The top card of
+    soros is placed whenever it fits, on a random SuitDeck, preferring
+    the ones already started.
+    """
+    game, stock_seen = state
+    if not stock_seen:
+        game = game.shuffled_deck(rng)
+
+    def choose(game:GameState, moves:List[int]) -> int:
+        piles = game.piles()
+        started = [i for i in moves if piles[i] is not None]
+        return rng.choice(started or moves)
+
+    return play_out(game, choose)
+
+def _worker(requests, results, n_rollouts:int, batch:int, niceness:int):
+    """Runs rollouts for the latest state received. Partial results
+    are sent after every batch, which is also when newer states are
+    checked, so work for a stale state stops within one batch.
+    """
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+    rng = random.Random()
+    request = requests.get()
+
+    while request is not None:
+        state_id, state = request
+        wins = done = 0
+
+        while done < n_rollouts:
+            for _ in range(min(batch, n_rollouts - done)):
+                wins += rollout(state, rng)
+                done += 1
+            results.put((state_id, wins, done))
+
+            try:
+                request = requests.get_nowait()
+                break       # A newer state arrived
+            except queue.Empty:
+                pass
+        else:
+            request = requests.get()    # Idle until the player acts
+
+        # Keep only the most recent state
+        while request is not None:
+            try:
+                request = requests.get_nowait()
+            except queue.Empty:
+                break
+
+
+class WinEstimator:
+    """Estimates the chance to win from the latest submitted state
+    with rollouts running in a background process.
+    """
+
+    def __init__(self, n_rollouts:int = 2000, batch:int = 50,
+                 niceness:int = 10):
+        """n_rollouts: optional, rollouts played for each state.
+        batch: optional, rollouts played between two result updates.
+        niceness: optional, priority decrease of the worker process.
+        """
+        self._n_rollouts = n_rollouts
+        self._batch = batch
+        self._niceness = niceness
+        self._state_id = 0
+        self._estimate = None       # (wins, rollouts) of current state
+        self._requests = None
+        self._results = None
+        self._process = None
+
+    def start(self) -> None:
+        """Starts the worker process."""
+        if self._process is not None:
+            return
+        # Spawn a fresh interpreter, the window already runs threads
+        # (event log) and holds the Tk connection, forking them is unsafe.
+        context = mp.get_context("spawn")
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._process = context.Process(target = _worker,
+                                        args = (self._requests,
+                                                self._results,
+                                                self._n_rollouts,
+                                                self._batch,
+                                                self._niceness),
+                                        daemon = True)
+        self._process.start()
+
+    def submit(self, state:State) -> None:
+        """Makes state the current state. Older results are ignored."""
+        self._state_id += 1
+        self._estimate = None
+        if self._process is not None:
+            self._requests.put((self._state_id, state))
+
+    def poll(self) -> tuple:
+        """Reads the available results without blocking. Returns
+        (wins, rollouts) for the current state, or None if no
+        rollout has finished yet.
+        """
+        if self._results is None:
+            return None
+        while True:
+            try:
+                state_id, wins, done = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if state_id == self._state_id:
+                self._estimate = (wins, done)
+        return self._estimate
+
+    def stop(self) -> None:
+        """Stops the worker process."""
+        if self._process is None:
+            return
+        self._requests.put(None)
+        self._process.join(timeout = 1)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
@@ -22,3 +22,7 @@ if __name__ == "__main__":
     sd1.push(Card('2', 'd'))
     sd1.push(Card('3', 'd'))
     print(sd1, sd1.number_of_cards())
+
+    # Two decks shuffled together contain two copies of every card
+    d2 = Deck(deck_size = 104)
+    print(d2.number_of_cards(), d2.count(Card('3', 's')))
@@ -0,0 +1,322 @@
+# Property based tests of Deck and SuitDeck.
+# Random sequences of operations are applied both to the real decks and
+# to a simple list based model, checking the invariants after each one.
+# Run with `pytest tests` from the main directory, or directly
+# with `python -m tests.test_properties`. The number of sequences can be
+# raised with the environment variable PASIENTZA_FUZZ_SEQUENCES.
+#----------------------------------
+#Michail E. Koutrakis
+#Github: https://github.com/mkoutra
+
+import copy
+import os
+import random
+from collections import Counter
+
+from lib.Card import Card
+from lib.DealAnalyzer import DEAD, analyze
+from lib.Decks import Deck, SuitDeck
+from lib.GameState import GameState, card_code
+
+N_SEQUENCES = int(os.environ.get("PASIENTZA_FUZZ_SEQUENCES", 5000))
+N_OPERATIONS = 60
+SEED = 2024
+
+# Every Deck is filled from this pool, so the cards on the decks and on
+# the models are the same objects and no Card is built per sequence.
+ALL_CARDS = [Card(rank, suit) for suit in "cdhs" for rank in Deck._allRanks]
+CARDS_BY_ID = {card.id(): card for card in ALL_CARDS}
+
+
+class DeckModel:
+    """Reference model of Deck. Cards are from ALL_CARDS, the top card
+    is last."""
+
+    def __init__(self, deck_size, n_copies, cards):
+        self.cards = list(cards)
+        self.removed = []
+        self.deck_size = deck_size
+        self.n_copies = n_copies
+        self.counts = Counter(card.id() for card in cards)
+
+    def can_push(self, card):
+        return (self.counts[card.id()] < self.n_copies
+                and len(self.cards) < self.deck_size)
+
+    def push(self, card):
+        self.cards.append(card)
+        self.counts[card.id()] += 1
+
+    def pop(self):
+        card = self.cards.pop()
+        self.removed.append(card)
+        self.counts[card.id()] -= 1
+        return card
+
+    def restore(self):
+        for card in reversed(self.removed):
+            self.push(card)
+        self.removed.clear()
+
+    def make_empty(self):
+        self.cards.clear()
+        self.removed.clear()
+        self.counts.clear()
+
+
+def new_deck(rng, deck_size:int, full:bool) -> Deck:
+    """Returns a Deck filled from ALL_CARDS and shuffled with rng."""
+    deck = Deck(full = False, deck_size = deck_size)
+    if full:
+        for card in ALL_CARDS * deck.n_copies():
+            deck.push(card)
+        permutation = list(range(deck_size))
+        rng.shuffle(permutation)
+        deck.shuffle(permutation)
+    return deck
+
+
+def check_deck(deck:Deck, model:DeckModel, rng):
+    # Cards are compared by identity first, so this is a fast check
+    assert deck[:] == model.cards
+    assert deck.number_of_cards() == len(model.cards)
+    assert deck.is_empty() == (not model.cards)
+    assert deck.is_full() == (len(model.cards) == model.deck_size)
+    assert (deck.top() is None if not model.cards
+            else deck.top() == model.cards[-1])
+
+    # The count of the top card and of a random one
+    for card in (model.cards[-1:] + [rng.choice(ALL_CARDS)]):
+        n = model.counts[card.id()]
+        assert n <= model.n_copies
+        assert deck.count(card) == n
+        assert deck.contains(card) == (n > 0)
+
+
+def deck_operation(rng, deck:Deck, model:DeckModel):
+    """Apply a random operation to deck and model."""
+    operation = rng.randrange(11)
+
+    if operation <= 2:      # push
+        card = rng.choice(ALL_CARDS)
+        if model.can_push(card):
+            deck.push(card)
+            model.push(card)
+        else:
+            try:
+                deck.push(card)
+            except Exception:
+                pass
+            else:
+                raise AssertionError(f"push({card}) should fail")
+    elif operation <= 4:    # pop
+        card = deck.pop()
+        if model.cards:
+            assert card is model.pop()
+        else:
+            assert card is None
+    elif operation == 5:    # shuffle, random or from a permutation
+        if rng.random() < 0.5:
+            deck.shuffle()
+            assert Counter(map(id, deck[:])) == Counter(map(id, model.cards))
+            model.cards = deck[:]
+        else:
+            permutation = list(range(len(model.cards)))
+            rng.shuffle(permutation)
+            deck.shuffle(permutation)
+            model.cards = [model.cards[i] for i in permutation]
+
+            # Not a permutation: the deck must stay unchanged
+            if len(model.cards) > 1:
+                try:
+                    deck.shuffle([0] * len(model.cards))
+                except Exception:
+                    pass
+                else:
+                    raise AssertionError("shuffle([0, 0, ...]) should fail")
+    elif operation == 6:    # inverse
+        deck.inverse()
+        model.cards.reverse()
+    elif operation == 7:    # restore
+        if len(model.cards) + len(model.removed) == model.deck_size:
+            deck.restore()
+            model.restore()
+        else:
+            try:
+                deck.restore()
+            except Exception:
+                pass
+            else:
+                raise AssertionError("restore() should fail")
+    elif operation == 8:    # make_empty
+        if rng.random() < 0.2:
+            deck.make_empty()
+            model.make_empty()
+    elif operation == 9:    # top_cards and __getitem__
+        n = rng.randrange(len(model.cards) + 2)
+        assert deck.top_cards(n) == model.cards[::-1][:n]
+        i = rng.randrange(-1, len(model.cards) + 1)
+        if 0 <= i < len(model.cards):
+            assert deck[i] is model.cards[i]
+        else:
+            assert deck[i] is None
+    else:                   # copy and deepcopy are independent
+        # deepcopy() builds new Cards, it costs as much as the rest
+        copy_function = copy.deepcopy if rng.random() < 0.1 else copy.copy
+        deck_copy = copy_function(deck)
+        assert type(deck_copy) is type(deck)
+        assert deck_copy.deck_size() == deck.deck_size()
+        check_deck(deck_copy, model, rng)
+        deck_copy.pop()
+        check_deck(deck, model, rng)
+
+
+def test_deck_matches_model():
+    rng = random.Random(SEED)
+
+    for _ in range(N_SEQUENCES):
+        deck_size = rng.choice([52, 52, 104])
+        deck = new_deck(rng, deck_size, full = rng.random() < 0.5)
+        model = DeckModel(deck_size, deck.n_copies(), deck[:])
+        check_deck(deck, model, rng)
+
+        for _ in range(N_OPERATIONS):
+            deck_operation(rng, deck, model)
+            check_deck(deck, model, rng)
+
+
+def check_suit_deck(suit_deck:SuitDeck):
+    cards = suit_deck[:]
+    assert len(cards) <= 13
+    if cards:
+        assert cards[0].rank() in "KA"
+        assert suit_deck.direction() == (1 if cards[0].rank() == 'A' else -1)
+    # A goes up to K, K goes down to A, never both ways
+    for i, card in enumerate(cards):
+        assert card.suit() == cards[0].suit()
+        assert card.value() == cards[0].value() + i * suit_deck.direction()
+
+
+def fits(card:Card, suit_deck:SuitDeck) -> bool:
+    """Reference rules of SuitDeck.push()."""
+    if suit_deck.is_empty():
+        return card.rank() in "KA"
+    bottom = suit_deck[0]
+    step = 1 if bottom.rank() == 'A' else -1
+    return (suit_deck.number_of_cards() < 13 and bottom.suit() == card.suit()
+            and card.value() == suit_deck.top().value() + step)
+
+
+def test_suit_deck_push_rules():
+    rng = random.Random(SEED + 1)
+
+    for _ in range(N_SEQUENCES):
+        suit_deck = SuitDeck()
+        for _ in range(N_OPERATIONS):
+            card = rng.choice(ALL_CARDS)
+            expected = fits(card, suit_deck)
+            try:
+                suit_deck.push(card)
+                pushed = True
+            except Exception:
+                pushed = False
+            assert pushed == expected
+            check_suit_deck(suit_deck)
+
+            if rng.random() < 0.1:
+                suit_deck.make_empty()
+
+
+def test_suit_deck_keeps_one_direction():
+    """With two decks, a K, Q, K sequence must still be rejected."""
+    for first, second in (('K', 'Q'), ('A', '2')):
+        suit_deck = SuitDeck()
+        suit_deck.push(Card(first, 'h'))
+        suit_deck.push(Card(second, 'h'))
+        try:
+            suit_deck.push(Card(first, 'h'))
+        except Exception:
+            pass
+        else:
+            raise AssertionError(f"{first}, {second}, {first} was accepted")
+        check_suit_deck(suit_deck)
+
+
+def check_game(deck:Deck, soros:Deck, suit_decks:list, state:GameState,
+               all_ids:Counter):
+    """No card is lost or created and state holds the same cards."""
+    ids = Counter(card.id() for card in deck[:])
+    ids += Counter(card.id() for card in soros[:])
+    for suit_deck in suit_decks:
+        check_suit_deck(suit_deck)
+        ids += Counter(card.id() for card in suit_deck[:])
+    assert ids == all_ids
+
+    assert state.deck_codes() == [card_code(c) for c in deck[::-1]]
+    assert state.soros_codes() == [card_code(c) for c in soros[::-1]]
+
+
+def test_random_games_conserve_cards():
+    """Play random games with Deck, soros and SuitDecks as GameWindow
+    does, next to GameState, and check that no card is lost or created.
+    """
+    rng = random.Random(SEED + 2)
+
+    for _ in range(max(1, N_SEQUENCES // 20)):
+        deck_size = rng.choice([52, 104])
+        n_suitdecks = deck_size // 52 * 8
+        deck = Deck(deck_size = deck_size)
+        analysis = analyze(deck, n_suitdecks)
+        all_ids = Counter(card.id() for card in deck[:])
+        soros = Deck(full = False, deck_size = deck_size)
+        suit_decks = [SuitDeck() for _ in range(n_suitdecks)]
+        state = GameState.from_deck(deck, n_suitdecks)
+        placed = True   # A card was placed since the last recycle
+
+        while True:
+            legal = [i for i, sd in enumerate(suit_decks)
+                     if not soros.is_empty() and fits(soros.top(), sd)]
+            assert legal == state.legal_moves()
+
+            if legal and rng.random() < 0.8:
+                i = rng.choice(legal)
+                suit_decks[i].push(soros.pop())
+                state = state.place(i)
+                placed = True
+                check_suit_deck(suit_decks[i])
+            else:
+                if deck.is_empty():
+                    check_game(deck, soros, suit_decks, state, all_ids)
+                    if soros.is_empty() or not placed:
+                        break
+                    placed = False
+                    soros.inverse()
+                    deck, soros = soros, deck
+                    soros.make_empty()
+                for _ in range(3):
+                    card = deck.pop()
+                    if card is None:
+                        break
+                    soros.push(card)
+                state = state.draw()
+
+            # Every card is checked on each round, only the sizes and
+            # the top of soros on every move.
+            assert (deck.number_of_cards() + soros.number_of_cards()
+                    + sum(sd.number_of_cards() for sd in suit_decks)
+                    == deck_size)
+            assert state.deck_size() == deck.number_of_cards()
+            assert state.soros_top() == (None if soros.is_empty()
+                                         else card_code(soros.top()))
+
+        if deck.is_empty() and soros.is_empty():
+            assert state.is_won()
+            assert analysis != DEAD
+
+
+if __name__ == "__main__":
+    test_deck_matches_model()
+    test_suit_deck_push_rules()
+    test_suit_deck_keeps_one_direction()
+    test_random_games_conserve_cards()
+    print("All property tests passed.")